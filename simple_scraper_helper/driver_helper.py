@@ -4,6 +4,8 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from selenium_helper import SeleniumHelper
+from locator_helper import JS_FIND_ALL, to_js_locator
+from extraction_schema import JS_EXTRACT, Group
 
 from selenium.webdriver.chrome.webdriver import WebDriver
 from selenium.webdriver.common.by import By
@@ -13,10 +15,110 @@ from selenium.webdriver.remote.webelement import WebElement
 
 # wait seconds between retry
 import time
+from uuid import uuid4
 from functools import wraps
-from typing import Callable, Any, List, Literal
+from typing import Callable, Any, List, Literal, Iterator, Tuple
 
 
+# Returns the new items, each with its fingerprint. Returned items are marked with
+# their fingerprint, so they are skipped later unless their node is recycled for a new item.
+# With `observe`, the first call scans the page and installs a MutationObserver
+# (stored in `window[marker]`) queueing the added items, later calls only drain that queue.
+# A page navigation drops the observer, so the next call scans the new page again.
+JS_HARVEST_NEW_ITEMS = (
+    JS_FIND_ALL
+    + """
+const [locator, altLocator, marker, fingerprintAttr, observe] = arguments;
+const fingerprint = (el) => {
+    if (fingerprintAttr && el.hasAttribute(fingerprintAttr)) {
+        return fingerprintAttr + ":" + el.getAttribute(fingerprintAttr);
+    }
+    return "key:" + [
+        el.tagName,
+        el.getAttribute("id"),
+        el.getAttribute("href"),
+        (el.textContent || "").trim(),
+    ].join("|").slice(0, 1000);
+};
+// `node` itself and its descendants matching a css locator
+const matching = (node, loc) => {
+    const found = node.matches(loc[1]) ? [node] : [];
+    return found.concat(Array.from(node.querySelectorAll(loc[1])));
+};
+const canObserve = observe && locator[0] === "css"
+    && (!altLocator || altLocator[0] === "css");
+const queue = (state, mutations) => {
+    for (const mutation of mutations) {
+        for (const node of mutation.addedNodes) {
+            if (node.nodeType !== Node.ELEMENT_NODE) continue;
+            state.added.push(...matching(node, locator));
+            if (altLocator) state.altAdded.push(...matching(node, altLocator));
+        }
+    }
+};
+let state = window[marker];
+let items;
+if (canObserve && state) {
+    queue(state, state.observer.takeRecords());
+    items = state.added.length ? state.added : state.altAdded;
+    state.added = [];
+    state.altAdded = [];
+} else {
+    items = findAll(document, locator);
+    if (!items.length && altLocator) {
+        items = findAll(document, altLocator);
+    }
+    if (canObserve) {
+        state = window[marker] = {added: [], altAdded: []};
+        state.observer = new MutationObserver((mutations) => queue(state, mutations));
+        state.observer.observe(document, {childList: true, subtree: true});
+    }
+}
+const fresh = [];
+for (const el of items) {
+    if (!el.isConnected) continue;
+    const fp = fingerprint(el);
+    if (el.getAttribute(marker) === fp) continue;
+    el.setAttribute(marker, fp);
+    fresh.push([el, fp]);
+}
+return fresh;
+"""
+)
+
+# Disconnect the MutationObserver installed by `JS_HARVEST_NEW_ITEMS`
+JS_HARVEST_CLEANUP = """
+const state = window[arguments[0]];
+if (state) {
+    state.observer.disconnect();
+    delete window[arguments[0]];
+}
+"""
+
+# Scroll the last harvested item to the top of its scroll container (or of the window),
+# then scroll that container to its bottom, so a loading sentinel placed after the list shows up.
+JS_SCROLL_TO_ITEM = """
+const item = arguments[0];
+const scrollContainer = (el) => {
+    for (let p = el && el.parentElement; p && p !== document.body; p = p.parentElement) {
+        const overflow = getComputedStyle(p).overflowY;
+        if ((overflow === "auto" || overflow === "scroll") && p.scrollHeight > p.clientHeight) {
+            return p;
+        }
+    }
+    return null;
+};
+if (item) {
+    item.scrollIntoView({block: "start"});
+}
+const container = scrollContainer(item);
+if (container) {
+    container.scrollTop = container.scrollHeight;
+} else {
+    window.scrollTo(0, document.scrollingElement.scrollHeight);
+}
+"""
+
 
 class DriverHelper(SeleniumHelper):
     def __init__(
@@ -65,6 +167,177 @@ class DriverHelper(SeleniumHelper):
             results = self.driver.find_elements(*alternative_element)
         return results
 
+    def harvest(
+        self,
+        item_selector: Tuple[By, str],
+        alternative_item_selector: Tuple[By, str] | None = None,
+        next_selector: Tuple[By, str] | None = None,
+        fingerprint_attribute: str | None = None,
+        max_idle_steps: int = 3,
+        step_interval: int | float = 1,
+        max_steps: int | None = None,
+        recycled_nodes: bool = False,
+        marker_attribute: str = "data-harvested",
+        retry: int = 5,
+        retry_interval: int = 1,
+    ) -> Iterator[WebElement]:
+        """
+        Yield the items of an infinite-scroll/paginated list, step by step.\n
+        After each scroll (or click on the "next" button), only the newly appeared items are yielded.
+        The first step scans the page, then a `MutationObserver` queues the added items,
+        so each later step only handles the new items, however long the list grows.
+        The page is scanned again on every step for xpath locators (an added node can't be matched against an xpath cheaply),
+        with `recycled_nodes`, and after a "next" click loading a new page.
+
+        ## Parameter
+        :param item_selector: E.g. `(By.CSS_SELECTOR, "div.card")`, same as the `element` in `find_altered_elements`\n
+        :param alternative_item_selector: used when `item_selector` finds nothing, like `find_altered_elements`\n
+        :param next_selector: if set, click this element to load the next page, instead of scrolling past the last item\n
+        :param fingerprint_attribute: attribute identifying an item (E.g. "href", "data-id"), items with the same fingerprint are yielded only once. If `None`, or if an item doesn't have this attribute, the item's tag, id, href and text are used, so distinct items with the same text and no id/href (E.g. repeated "Buy" tiles) are yielded only once\n
+        :param max_idle_steps: stop after this many consecutive steps without any new item\n
+        :param step_interval: Seconds waited after each scroll/click for new items to load\n
+        :param max_steps: if set, stop after this many scrolls/clicks\n
+        :param recycled_nodes: set to `True` for virtualized lists, which reuse the same nodes for new items. Every rendered item is then fingerprinted again on each step\n
+        :param marker_attribute: prefix of the attribute set on the returned items, holding their fingerprint. A random suffix is added for each call, so another `harvest` on the same page starts afresh. The attribute is left on the items afterward\n
+        :param retry: number of retries of a step, when the page is changing under it\n
+        :param retry_interval: Seconds between each retry
+        """
+        self.check_driver()["driverExist"]
+
+        locator = to_js_locator(*item_selector)
+        alt_locator = (
+            to_js_locator(*alternative_item_selector)
+            if alternative_item_selector
+            else None
+        )
+        marker = f"{marker_attribute}-{uuid4().hex}"
+        seen_fingerprints = set()
+        last_item: WebElement | None = None
+        idle_steps = 0
+        step = 0
+        try:
+            while True:
+                fresh = self.harvest_step(
+                    locator,
+                    alt_locator,
+                    marker,
+                    fingerprint_attribute,
+                    observe=not recycled_nodes,
+                    retry=retry,
+                    retry_interval=retry_interval,
+                )
+                new_count = 0
+                for element, fingerprint in fresh:
+                    last_item = element
+                    if fingerprint in seen_fingerprints:
+                        continue
+                    seen_fingerprints.add(fingerprint)
+                    new_count += 1
+                    yield element
+
+                idle_steps = 0 if new_count else idle_steps + 1
+                if idle_steps >= max_idle_steps:
+                    self.log(
+                        f"No new item after {idle_steps} step(s), harvested {len(seen_fingerprints)} item(s)"
+                    )
+                    return
+                if max_steps is not None and step >= max_steps:
+                    self.log(
+                        f"Reached {max_steps} step(s), harvested {len(seen_fingerprints)} item(s)"
+                    )
+                    return
+                step += 1
+
+                if next_selector:
+                    next_buttons = self.driver.find_elements(*next_selector)
+                    if not next_buttons:
+                        self.log(
+                            f"Can't find the next button {next_selector[1]}, harvested {len(seen_fingerprints)} item(s)"
+                        )
+                        return
+                    self.click_next_button(next_buttons[0])
+                else:
+                    try:
+                        self.driver.execute_script(JS_SCROLL_TO_ITEM, last_item)
+                    except self.element_exception as err:
+                        self.log(
+                            f"Can't scroll to the last item, scrolling the window instead: {self.get_error_msg(err)}",
+                            "warning",
+                        )
+                        self.driver.execute_script(JS_SCROLL_TO_ITEM, None)
+                time.sleep(step_interval)
+        finally:
+            try:
+                self.driver.execute_script(JS_HARVEST_CLEANUP, marker)
+            except self.driver_exception + self.network_exception as err:
+                self.log(
+                    f"Can't disconnect the harvest observer: {self.get_error_msg(err)}",
+                    "warning",
+                )
+
+    def click_next_button(self, button: WebElement) -> None:
+        """
+        Click the "next" button of a paginated list, with javascript if it is covered or disabled.\n
+        If it still can't be clicked, no new item shows up and `harvest` stops after `max_idle_steps`
+        """
+        try:
+            button.click()
+            return
+        except self.element_exception + self.click_exception as err:
+            self.log(
+                f"Can't click the next button, clicking it with javascript instead: {self.get_error_msg(err)}",
+                "warning",
+            )
+        try:
+            self.driver.execute_script("arguments[0].click();", button)
+        except self.element_exception as err:
+            self.log(
+                f"Can't click the next button: {self.get_error_msg(err)}",
+                "warning",
+            )
+
+    def harvest_step(
+        self,
+        locator: Tuple[str, str],
+        alt_locator: Tuple[str, str] | None,
+        marker_attribute: str,
+        fingerprint_attribute: str | None,
+        observe: bool = True,
+        retry: int = 5,
+        retry_interval: int = 1,
+    ) -> List[Tuple[WebElement, str]]:
+        """
+        Run `JS_HARVEST_NEW_ITEMS` once, retrying while the page is changing under it\n
+        The driver isn't reopened, since it would lose the harvested page
+        """
+        retry_record = 0
+        last_err = ""
+        for _ in range(retry):
+            try:
+                return self.driver.execute_script(
+                    JS_HARVEST_NEW_ITEMS,
+                    locator,
+                    alt_locator,
+                    marker_attribute,
+                    fingerprint_attribute,
+                    observe,
+                )
+            except self.element_exception as err:
+                last_err = err
+            except self.script_exception:
+                raise
+            except self.driver_exception + self.network_exception as err:
+                last_err = err
+            retry_record += 1
+            self.log(
+                f"Retrying harvesting items for the {retry_record} time(s), while handling this error :{self.get_error_msg(last_err)}",
+                "error",
+            )
+            time.sleep(retry_interval)
+        raise ValueError(
+            f"Cant harvest items after {retry_record} retries, last error was {last_err}"
+        )
+
     @selenium_try_loop
     def check_element_loaded(self, element, altered_element=None) -> None:
         if altered_element:
@@ -136,6 +409,64 @@ class DriverHelper(SeleniumHelper):
             return None if default_value == "None" else default_value
         raise ValueError(f"Last error was {last_err}")
 
+    def extract(
+        self,
+        schema: Group,
+        element_as_finder: WebElement = None,
+        retry: int = 5,
+        retry_interval: int = 1,
+    ) -> Any:
+        """
+        Extract structured records described by `schema`, in a single injected script\n
+        Instead of one `force_find_element` per field, every field of every record is read in one round trip,
+        `post_process` and `default_value` are applied afterward.\n
+        If a field can't be found, the whole extraction is retried like `force_find_element`,
+        the fields with `default_value` get it only after the last retry, the others raise `ValueError`
+
+        ## Parameter
+        :param schema: `Group` describing the records, E.g. `Group({...}, By.CSS_SELECTOR, "div.card", many=True)`\n
+        :param element_as_finder: using an element as the root of the schema, instead of the whole page. The page isn't refreshed between retries then\n
+        :param retry: number of retries\n
+        :param retry_interval: Seconds between each retry
+        """
+        self.check_driver()["driverExist"]
+
+        spec = schema.compile()
+        retry_record = 0
+        last_err = ""
+        for trying in range(retry):
+            try:
+                data, missing = self.driver.execute_script(
+                    JS_EXTRACT, spec, element_as_finder
+                )
+                unresolved: List[str] = []
+                result = schema.finalize(data, "", set(missing), unresolved)
+                # like `force_find_element`, `default_value` is only used after the last retry
+                if not missing or (trying == retry - 1 and not unresolved):
+                    return result
+                last_err = f"Cant find fields {', '.join(unresolved or missing)}"
+                # a refresh would make `element_as_finder` stale
+                if trying == int(retry / 2) and element_as_finder is None:
+                    self.driver.refresh()
+                    time.sleep(int(retry / 2))
+            except self.element_exception as err:
+                last_err = err
+            except self.script_exception:
+                raise
+            except self.driver_exception as err:
+                last_err = err
+                self.reopen_driver(retry_count=retry_record)
+            except self.network_exception as err:
+                last_err = err
+                self.reopen_driver(retry_count=retry_record)
+            retry_record += 1
+            self.log(
+                f"Retrying extracting records for the {retry_record} time(s), while handling this error :{last_err}",
+                "error",
+            )
+            time.sleep(retry_interval)
+        raise ValueError(f"Last error was {last_err}")
+
     def force_get(
         self,
         url: str,
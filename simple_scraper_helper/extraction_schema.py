@@ -0,0 +1,218 @@
+from __future__ import annotations
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from locator_helper import JS_FIND_ALL, to_js_locator
+
+from selenium.webdriver.common.by import By
+
+from typing import Any, Callable, Dict, List, Literal, Tuple
+
+
+# Walks a spec compiled by `Group.compile` and returns `[records, missing_paths]` in one round trip.
+# Paths are built the same way as in `Group.finalize`, E.g. "cards[2].price"
+JS_EXTRACT = (
+    JS_FIND_ALL
+    + """
+const [spec, rootElement] = arguments;
+const missing = [];
+const join = (path, name) => (path ? path + "." + name : name);
+const findIn = (root, node) => {
+    if (!node.locator) return [root];
+    let found = findAll(root, node.locator);
+    if (!found.length && node.alt) {
+        found = findAll(root, node.alt);
+    }
+    return found;
+};
+const readValue = (el, attribute) => {
+    if (attribute === "text") {
+        return (el.innerText ?? el.textContent ?? "").trim();
+    }
+    if (attribute === "html") return el.innerHTML;
+    const value = el[attribute];
+    return value === undefined || value === null
+        ? el.getAttribute(attribute)
+        : value;
+};
+const isMissing = (value) => value === null || value === undefined;
+const readRecord = (el, node, path) => {
+    const record = {};
+    for (const [name, child] of Object.entries(node.fields)) {
+        record[name] = extract(el, child, join(path, name));
+    }
+    return record;
+};
+const extract = (root, node, path) => {
+    const found = findIn(root, node);
+    if (node.type === "field") {
+        // a `many` field keeps `null` for the elements without the wanted attribute,
+        // so it stays aligned with its sibling fields. A single element without it is missing
+        const values = found.map((el) => readValue(el, node.attribute));
+        if (!values.length || (!node.many && isMissing(values[0]))) {
+            missing.push(path);
+            return null;
+        }
+        return node.many ? values : values[0];
+    }
+    if (!found.length) {
+        missing.push(path);
+        return null;
+    }
+    return node.many
+        ? found.map((el, i) => readRecord(el, node, path + "[" + i + "]"))
+        : readRecord(found[0], node, path);
+};
+return [extract(rootElement || document, spec, ""), missing];
+"""
+)
+
+
+class Field:
+    def __init__(
+        self,
+        method: By | None = None,
+        selector: str | None = None,
+        attribute: str = "text",
+        post_process: Callable[[Any], Any] | None = None,
+        alternative: Tuple[By, str] | None = None,
+        many: bool = False,
+        default_value: Any | None | Literal["None"] = None,
+    ) -> None:
+        """
+        A single value of a record, E.g. the title of a card\n
+
+        ## Parameter
+        :param method: Method to find the element, relative to the record. If `method` and `selector` are `None`, the record's element itself is used\n
+        :param selector: E.g. "./h2", ".price"\n
+        :param attribute: "text" for the trimmed text, "html" for the inner html, otherwise the element's property/attribute, E.g. "href"\n
+        :param post_process: function applied to the value (to each value except `None` if `many`), E.g. `float`\n
+        :param alternative: `(method, selector)` used when `selector` finds nothing, like `find_altered_elements`\n
+        :param many: if `True`, the value is the list of values of all matched elements, with `None` for the elements without the wanted attribute\n
+        :param default_value: if not `None`, will be used if the element (or its attribute) cant be found after all retries, E.g. `[]` for an optional `many` field. If you want `None`, parse the string "None".
+        """
+        self.method = method
+        self.selector = selector
+        self.attribute = attribute
+        self.post_process = post_process
+        self.alternative = alternative
+        self.many = many
+        self.default_value = default_value
+
+    def locators(self) -> Dict[str, Any]:
+        return {
+            "locator": to_js_locator(self.method, self.selector)
+            if self.selector
+            else None,
+            "alt": to_js_locator(*self.alternative) if self.alternative else None,
+        }
+
+    def compile(self) -> Dict[str, Any]:
+        """Spec of this field, to be parsed into the injected script"""
+        return {
+            "type": "field",
+            "attribute": self.attribute,
+            "many": self.many,
+            **self.locators(),
+        }
+
+    def default(self, path: str, unresolved: List[str]) -> Any:
+        if self.default_value is not None:
+            return None if self.default_value == "None" else self.default_value
+        unresolved.append(path)
+        return None
+
+    def finalize(
+        self, value: Any, path: str, missing: set, unresolved: List[str]
+    ) -> Any:
+        """
+        Apply `post_process` and `default_value` on the value returned by the script,
+        paths of required values that couldn't be found are appended to `unresolved`
+        """
+        if path in missing:
+            return self.default(path, unresolved)
+        if not self.post_process:
+            return value
+        if self.many:
+            return [None if v is None else self.post_process(v) for v in value]
+        return self.post_process(value)
+
+
+class Group(Field):
+    def __init__(
+        self,
+        fields: Dict[str, Field],
+        method: By | None = None,
+        selector: str | None = None,
+        alternative: Tuple[By, str] | None = None,
+        many: bool = False,
+        post_process: Callable[[Any], Any] | None = None,
+        default_value: Any | None | Literal["None"] = None,
+    ) -> None:
+        """
+        A record made of `fields`, which can be `Field` or nested `Group`\n
+        E.g. a list of cards:
+        ```python
+        Group(
+            {
+                "title": Field(By.CSS_SELECTOR, "h2"),
+                "price": Field(By.CSS_SELECTOR, ".price", post_process=float),
+                "link": Field(By.TAG_NAME, "a", attribute="href"),
+            },
+            By.CSS_SELECTOR, "div.card", many=True,
+        )
+        ```
+
+        ## Parameter
+        :param fields: name of the field -> `Field` or `Group`\n
+        :param method: Method to find the record's element, relative to the parent record. If `method` and `selector` are `None`, the parent's element is used\n
+        :param many: if `True`, the value is the list of records of all matched elements\n
+        :param post_process: function applied to the record (to each record if `many`)\n
+        Other parameters are the same as `Field`
+        """
+        super().__init__(
+            method=method,
+            selector=selector,
+            post_process=post_process,
+            alternative=alternative,
+            many=many,
+            default_value=default_value,
+        )
+        self.fields = fields
+
+    def compile(self) -> Dict[str, Any]:
+        return {
+            "type": "group",
+            "many": self.many,
+            "fields": {
+                name: field.compile() for name, field in self.fields.items()
+            },
+            **self.locators(),
+        }
+
+    def finalize_record(
+        self, record: Dict[str, Any], path: str, missing: set, unresolved: List[str]
+    ) -> Dict[str, Any]:
+        result = {
+            name: field.finalize(
+                record[name],
+                f"{path}.{name}" if path else name,
+                missing,
+                unresolved,
+            )
+            for name, field in self.fields.items()
+        }
+        return self.post_process(result) if self.post_process else result
+
+    def finalize(
+        self, value: Any, path: str, missing: set, unresolved: List[str]
+    ) -> Any:
+        if path in missing:
+            return self.default(path, unresolved)
+        if self.many:
+            return [
+                self.finalize_record(record, f"{path}[{i}]", missing, unresolved)
+                for i, record in enumerate(value)
+            ]
+        return self.finalize_record(value, path, missing, unresolved)
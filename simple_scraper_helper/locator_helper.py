@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from selenium.webdriver.common.by import By
+
+from typing import Tuple
+
+
+# JS helper shared by the injected scripts: `findAll(root, [kind, expr])`
+# returns every element matching a css/xpath locator under `root`
+JS_FIND_ALL = """
+const findAll = (root, locator) => {
+    const [kind, expr] = locator;
+    if (kind === "css") {
+        return Array.from(root.querySelectorAll(expr));
+    }
+    const snapshot = document.evaluate(
+        expr, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    const found = [];
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        found.push(snapshot.snapshotItem(i));
+    }
+    return found;
+};
+"""
+
+
+def to_js_locator(method: By, selector: str) -> Tuple[str, str]:
+    """
+    Translate a selenium locator into `["css" | "xpath", expression]`,
+    which can be parsed into the injected scripts
+    """
+    if method == By.XPATH:
+        return ("xpath", selector)
+    if method == By.CSS_SELECTOR:
+        return ("css", selector)
+    if method == By.ID:
+        return ("css", f'[id="{selector}"]')
+    if method == By.NAME:
+        return ("css", f'[name="{selector}"]')
+    if method == By.CLASS_NAME:
+        return ("css", f".{selector}")
+    if method == By.TAG_NAME:
+        return ("css", selector)
+    raise ValueError(
+        f"Locator method `{method}` can't be used inside an injected script, use one of xpath, css selector, id, name, class name, tag name"
+    )
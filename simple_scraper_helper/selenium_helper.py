@@ -10,6 +10,10 @@ from selenium.common.exceptions import (
     StaleElementReferenceException,
     WebDriverException,
     TimeoutException,
+    JavascriptException,
+    InvalidSelectorException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
 )
 from selenium import common
 from urllib3.exceptions import NewConnectionError, MaxRetryError
@@ -49,6 +53,16 @@ class SeleniumHelper:
             NewConnectionError,
             MaxRetryError,
         )
+        # raised by a broken script/selector, retrying won't fix them
+        self.script_exception: Tuple[Exception, ...] = (
+            JavascriptException,
+            InvalidSelectorException,
+        )
+        # raised when an element is covered or disabled, while clicking it
+        self.click_exception: Tuple[Exception, ...] = (
+            ElementClickInterceptedException,
+            ElementNotInteractableException,
+        )
 
     def log(
         self, msg: str, type: Literal["warning", "error", "info"] = "info"